@@ -2,106 +2,357 @@
 Motor del navegador: Configuración de QWebEngineView, perfiles y gestión de permisos
 """
 
-from typing import Optional
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+from urllib.parse import quote_plus
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QLineEdit, 
-    QPushButton, QToolBar, QStatusBar, QProgressBar, QApplication
+    QPushButton, QToolBar, QStatusBar, QProgressBar, QApplication,
+    QTabWidget, QToolButton
 )
-from PyQt6.QtCore import Qt, QUrl
-from PyQt6.QtGui import QAction, QKeySequence, QIcon
-import os
+from PyQt6.QtCore import (
+    QMetaObject, QObject, QRunnable, QThreadPool, Qt, QTimer, QUrl, pyqtSignal
+)
+from PyQt6.QtGui import QAction, QCloseEvent, QKeySequence, QIcon
+import logging
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebEngineCore import (
     QWebEngineSettings, QWebEnginePermission, 
     QWebEngineProfile, QWebEnginePage, QWebEngineFullScreenRequest
 )
-from PyQt6.QtNetwork import QNetworkProxy
-from .tor_logic import TorManager
+import functools
+import itertools
 import random
-import re
 
 from .logging_config import get_logger
-from .config import get_config, load_user_agents
+from .config import DEFAULT_USER_AGENTS, BrowserConfig, get_config, load_user_agents
+
+if TYPE_CHECKING:
+    from .tor_logic import TorManager
+
+logger = get_logger(__name__)
+
+# Caracteres que indican que el texto es una URL y no una búsqueda
+_URL_CHARS = frozenset('./:')
+
+# Prefijos de esquema aceptados tal cual en la barra de direcciones
+_VALID_PREFIXES = ('http://', 'https://', 'file://')
+
+# Búsqueda para el texto que no parece una URL
+_SEARCH_URL_TEMPLATE = "https://duckduckgo.com/?q={}"
+
+# Esquemas bloqueados por poder ejecutar código
+_DANGEROUS_SCHEMES = frozenset({'javascript', 'data', 'vbscript'})
+
+# Estilo de los toggles de la barra de herramientas (verde = activo,
+# naranja = Tor conectando, según la propiedad dinámica "connecting")
+_TOGGLE_STYLESHEET = """
+    QPushButton#torToggle:checked,
+    QPushButton#cameraToggle:checked,
+    QPushButton#microphoneToggle:checked {
+        background-color: #4caf50;
+        color: white;
+    }
+    QPushButton#torToggle:!checked {
+        background-color: #757575;
+        color: white;
+    }
+    QPushButton#cameraToggle:!checked,
+    QPushButton#microphoneToggle:!checked {
+        background-color: #f44336;
+        color: white;
+    }
+    QPushButton#torToggle[connecting="true"]:checked {
+        background-color: #d35400;
+    }
+"""
+
+# Página mostrada mientras se conecta a Tor
+_TOR_LOADING_HTML = """\
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body { font-family: 'Segoe UI', sans-serif; background-color: #2b2b2b; color: #ffffff; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; }
+        .container { text-align: center; }
+        .loader { border: 5px solid #333; border-top: 5px solid #d35400; border-radius: 50%; width: 50px; height: 50px; animation: spin 1s linear infinite; margin: 0 auto 20px; }
+        @keyframes spin { 0% { transform: rotate(0deg); } 100% { transform: rotate(360deg); } }
+        h2 { color: #d35400; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="loader"></div>
+        <h2>Conectando a Tor...</h2>
+        <p>Estableciendo circuito seguro. Por favor, espere unos segundos.</p>
+    </div>
+</body>
+</html>
+"""
+
+# Página mostrada al establecer la conexión con Tor
+_TOR_SUCCESS_HTML = """\
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body { font-family: 'Segoe UI', sans-serif; background-color: #2b2b2b; color: #ffffff; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; }
+        .container { text-align: center; }
+        .icon { font-size: 64px; color: #2ecc71; margin-bottom: 20px; }
+        h2 { color: #2ecc71; }
+        .btn { background-color: #3498db; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; display: inline-block; margin-top: 20px; text-decoration: none; cursor: pointer; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="icon">🔒</div>
+        <h2>Conexión Segura Establecida</h2>
+        <p>Ahora navegas a través de la red Tor.</p>
+        <p>Tu IP es anónima.</p>
+        <a href="https://check.torproject.org" class="btn">Verificar mi IP</a>
+    </div>
+</body>
+</html>
+"""
+
+# Página mostrada si no se pudo iniciar Tor
+_TOR_ERROR_HTML = """\
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body { font-family: 'Segoe UI', sans-serif; background-color: #2b2b2b; color: #ffffff; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; }
+        .container { text-align: center; max-width: 600px; padding: 20px; }
+        .icon { font-size: 64px; color: #e74c3c; margin-bottom: 20px; }
+        h2 { color: #e74c3c; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="icon">❌</div>
+        <h2>Error al conectar con Tor</h2>
+        <p>No se pudo iniciar el proceso Tor.</p>
+    </div>
+</body>
+</html>
+"""
+
+# Ajustes de página tomados de la configuración: (atributo, campo de BrowserConfig)
+_CONFIG_WEB_ATTRIBUTES = (
+    (QWebEngineSettings.WebAttribute.JavascriptEnabled, 'enable_javascript'),
+    # Deshabilitar completamente WebRTC para prevenir fugas de IP
+    (QWebEngineSettings.WebAttribute.WebRTCPublicInterfacesOnly, 'webrtc_public_only'),
+    # Deshabilitar plugins (seguridad)
+    (QWebEngineSettings.WebAttribute.PluginsEnabled, 'enable_plugins'),
+    # Deshabilitar local storage persistente
+    (QWebEngineSettings.WebAttribute.LocalStorageEnabled, 'enable_local_storage'),
+)
+
+# Ajustes de página fijos: (atributo, valor)
+_FIXED_WEB_ATTRIBUTES = (
+    (QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, False),
+    # Habilitar soporte para pantalla completa
+    (QWebEngineSettings.WebAttribute.FullScreenSupportEnabled, True),
+)
+
+# Icono de la aplicación
+_ICON_PATH = Path(__file__).resolve().parent / "assets" / "app_icon.png"
+
+# Perfil compartido por todas las pestañas (se crea en _shared_profile)
+_profile: Optional[QWebEngineProfile] = None
+
+# Número máximo de redirecciones recientes vigiladas para detectar loops
+_REDIRECT_HISTORY_SIZE = 16
+
+# Número máximo de pestañas cerradas que se conservan para reutilizarlas
+_TAB_POOL_SIZE = 4
+
+
+def validate_url(url_string: str) -> Optional[QUrl]:
+    """Valida y normaliza una URL o convierte búsqueda a URL"""
+    url_string = url_string.strip() if url_string else ''
+    if not url_string:
+        return None
+
+    # Sin '.', '/' ni ':' no puede ser una URL, una IP ni llevar esquema:
+    # se trata como búsqueda
+    if _URL_CHARS.isdisjoint(url_string):
+        search_url = _SEARCH_URL_TEMPLATE.format(quote_plus(url_string))
+        logger.debug("Búsqueda convertida a URL: %s", search_url)
+        return QUrl(search_url)
+
+    if url_string.startswith(_VALID_PREFIXES):
+        url = QUrl(url_string)
+    else:
+        # Qt deduce el esquema (dominio, IP, ruta local...) en una sola
+        # llamada; si no se escribió esquema se prefiere HTTPS
+        url = QUrl.fromUserInput(url_string)
+        if url.scheme() == 'http':
+            url.setScheme('https')
+
+    if not url.isValid() or url.isEmpty():
+        logger.warning("URL inválida: %s", url_string)
+        return None
+
+    scheme = url.scheme().lower()
+    if scheme in _DANGEROUS_SCHEMES:
+        logger.warning("URL bloqueada por esquema peligroso: %s", scheme)
+        return None
 
-logger = get_logger()
+    return url
+
+
+def _user_agents_or_default(user_agents_file: Path) -> List[str]:
+    """
+    Carga los User-Agents del archivo o los valores por defecto si falla
+    
+    load_user_agents ya memoriza el contenido por (ruta, mtime, tamaño), así
+    que un archivo editado se vuelve a leer en la siguiente pestaña.
+    """
+    try:
+        user_agents = load_user_agents(user_agents_file)
+        if user_agents:
+            return user_agents
+        logger.warning("Lista de User-Agents vacía en %s. Usando valores por defecto.", user_agents_file)
+    except Exception as e:
+        logger.warning("Error al cargar User-Agents: %s. Usando valores por defecto.", e)
+    return list(DEFAULT_USER_AGENTS)
+
+
+@functools.cache
+def _app_icon() -> Optional[QIcon]:
+    """Carga el icono de la aplicación una sola vez (None si no existe)"""
+    if not _ICON_PATH.is_file():
+        return None
+    return QIcon(str(_ICON_PATH))
+
+
+@functools.lru_cache(maxsize=1)
+def _user_agent_cycle(user_agents: Tuple[str, ...]) -> Iterator[str]:
+    """
+    Secuencia infinita de User-Agents en un orden aleatorio fijado una vez
+    
+    Es compartida por todas las pestañas (usan el mismo perfil), de modo que
+    las rotaciones recorren la lista completa antes de repetir. Si la lista
+    cambia, se crea una secuencia nueva.
+    """
+    return itertools.cycle(random.sample(user_agents, len(user_agents)))
+
+
+def _shared_profile(config: BrowserConfig) -> QWebEngineProfile:
+    """
+    Crea, una sola vez, el perfil "Off-the-record" (sin persistencia)
+    compartido por todas las pestañas
+    
+    El perfil cuelga de la QApplication para que viva más que cualquier página.
+    
+    Args:
+        config: Configuración usada en la primera llamada para los ajustes
+    """
+    global _profile
+    if _profile is not None:
+        return _profile
+    
+    profile = QWebEngineProfile(QApplication.instance())
+    profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.NoPersistentCookies)
+    profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.MemoryHttpCache)
+    
+    # Ajustes de privacidad y seguridad: los ajustes del perfil son los
+    # valores por defecto de todas sus páginas
+    settings = profile.settings()
+    for attribute, config_key in _CONFIG_WEB_ATTRIBUTES:
+        settings.setAttribute(attribute, getattr(config, config_key))
+    for attribute, value in _FIXED_WEB_ATTRIBUTES:
+        settings.setAttribute(attribute, value)
+    # Habilitar solo contenido seguro
+    settings.setAttribute(QWebEngineSettings.WebAttribute.AllowRunningInsecureContent, not config.block_insecure_content)
+    
+    _profile = profile
+    return profile
 
 
 class BrowserEngine(QWebEngineView):
     """Motor del navegador con gestión de permisos"""
     
-    def __init__(self, parent: Optional[QWidget] = None, debug_mode: Optional[bool] = None):
+    # Permisos ligados a un toggle:
+    # feature -> (atributo del toggle, atributo "concedido alguna vez", nombre para el log)
+    _PERM_TABLE = {
+        QWebEnginePage.Feature.MediaAudioCapture: ('microphone_enabled', '_mic_granted_once', 'Micrófono'),
+        QWebEnginePage.Feature.MediaVideoCapture: ('camera_enabled', '_camera_granted_once', 'Cámara'),
+    }
+    
+    def __init__(
+        self,
+        parent: Optional[QWidget] = None,
+        debug_mode: Optional[bool] = None,
+        config: Optional[BrowserConfig] = None
+    ):
         """
         Inicializa el motor del navegador
         
         Args:
             parent: Widget padre
             debug_mode: Modo debug. Si es None, usa la configuración global
+            config: Configuración a usar. Si es None, usa la configuración global
         """
         super().__init__(parent)
         
         # Obtener configuración
-        config = get_config()
+        if config is None:
+            config = get_config()
         self.debug_mode = debug_mode if debug_mode is not None else config.debug_mode
         
         # Estado de los permisos (por defecto bloqueados)
         self.camera_enabled = False
         self.microphone_enabled = False
         
-        # Cargar User-Agents desde archivo
-        try:
-            self.user_agents = load_user_agents(config.user_agents_file)
-        except Exception as e:
-            logger.warning(f"Error al cargar User-Agents: {e}. Usando valores por defecto.")
-            self.user_agents = [
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
-            ]
-        
-        # Configurar perfil "Off-the-record" (sin persistencia)
-        self.profile = QWebEngineProfile.defaultProfile()
-        self.profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.NoPersistentCookies)
-        self.profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.MemoryHttpCache)
+        # Cargar User-Agents (compartidos entre pestañas) y recorrerlos en un
+        # orden aleatorio fijado una sola vez
+        self.user_agents = _user_agents_or_default(config.user_agents_file)
+        self._ua_cycle = _user_agent_cycle(tuple(self.user_agents))
+        
+        # Perfil "Off-the-record" (sin persistencia) compartido por todas las pestañas
+        self.profile = _shared_profile(config)
         
         # Configurar User-Agent aleatorio para anti-fingerprinting
-        random_user_agent = random.choice(self.user_agents)
+        random_user_agent = next(self._ua_cycle)
         self.profile.setHttpUserAgent(random_user_agent)
-        logger.debug(f"User-Agent configurado: {random_user_agent[:50]}...")
+        logger.debug("User-Agent configurado: %.50s...", random_user_agent)
         
         # Configurar página web
-        self.page = QWebEnginePage(self.profile, self)
-        self.setPage(self.page)
+        self._page = QWebEnginePage(self.profile, self)
+        self.setPage(self._page)
         
         # Conectar señal featurePermissionRequested
-        self.page.featurePermissionRequested.connect(self.handle_permission_request)
+        self._page.featurePermissionRequested.connect(self.handle_permission_request)
         
         # Conectar señal fullScreenRequested
-        self.page.fullScreenRequested.connect(self.handle_fullscreen_request)
+        self._page.fullScreenRequested.connect(self.handle_fullscreen_request)
         
         # Conectar señal para forzar HTTPS (si está habilitado)
         if config.force_https:
-            self.page.urlChanged.connect(self.force_https_redirect)
-        
-        # Configurar ajustes de privacidad y seguridad
-        settings = self.settings()
-        settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, config.enable_javascript)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, False)
-        # Deshabilitar completamente WebRTC para prevenir fugas de IP
-        settings.setAttribute(QWebEngineSettings.WebAttribute.WebRTCPublicInterfacesOnly, config.webrtc_public_only)
-        # Deshabilitar plugins (seguridad)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.PluginsEnabled, config.enable_plugins)
-        # Deshabilitar local storage persistente
-        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalStorageEnabled, config.enable_local_storage)
-        # Habilitar solo contenido seguro
-        settings.setAttribute(QWebEngineSettings.WebAttribute.AllowRunningInsecureContent, not config.block_insecure_content)
-        # Habilitar soporte para pantalla completa
-        settings.setAttribute(QWebEngineSettings.WebAttribute.FullScreenSupportEnabled, True)
-        
-        # Protección contra loops infinitos en redirecciones HTTPS
-        self._https_redirect_count = 0
-        self._last_redirect_url: Optional[QUrl] = None
+            # Conexión encolada: se evalúa cuando Qt termina de procesar el
+            # cambio de URL, y el setUrl de la redirección nunca reentra
+            self._page.urlChanged.connect(self.force_https_redirect, Qt.ConnectionType.QueuedConnection)
+            # Una carga completada indica que no hay un loop de redirecciones en curso
+            self.loadFinished.connect(self._clear_redirect_history)
+        
+        # Protección contra loops de redirecciones HTTPS: host+ruta de las
+        # redirecciones hechas desde la última carga completada (LRU acotada)
+        self._recent_redirects: 'OrderedDict[str, None]' = OrderedDict()
+
+        # Posición en la barra de pestañas y último título mostrado
+        # (los mantiene BrowserWindow)
+        self._tab_index = -1
+        self._last_title: Optional[str] = None
+        
+        # Si la página tiene permisos concedidos que haya que revocar
+        self._camera_granted_once = False
+        self._mic_granted_once = False
+        
+        # Conexiones de señales hechas por BrowserWindow
+        self._connections: List[QMetaObject.Connection] = []
         
         logger.info("BrowserEngine inicializado con configuración de privacidad")
     
@@ -120,35 +371,27 @@ class BrowserEngine(QWebEngineView):
         """
         origin_str = security_origin.toString()
         
-        if feature == QWebEnginePage.Feature.MediaAudioCapture:
-            # Solicitud de micrófono
-            if self.microphone_enabled:
-                self.page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionGrantedByUser)
-                logger.info(f"Micrófono concedido para: {origin_str}")
+        entry = self._PERM_TABLE.get(feature)
+        if entry is not None:
+            # Cámara o micrófono: según el toggle respectivo
+            toggle_attr, granted_attr, label = entry
+            if getattr(self, toggle_attr):
+                self._page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionGrantedByUser)
+                setattr(self, granted_attr, True)
+                logger.info("Permiso concedido (%s) para: %s", label, origin_str)
             else:
-                self.page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionDeniedByUser)
-                logger.debug(f"Micrófono denegado para: {origin_str}")
+                self._page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionDeniedByUser)
+                logger.debug("Permiso denegado (%s) para: %s", label, origin_str)
                 
-        elif feature == QWebEnginePage.Feature.MediaVideoCapture:
-            # Solicitud de cámara
-            if self.camera_enabled:
-                self.page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionGrantedByUser)
-                logger.info(f"Cámara concedida para: {origin_str}")
-            else:
-                self.page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionDeniedByUser)
-                logger.debug(f"Cámara denegada para: {origin_str}")
-                self.page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionDeniedByUser)
-                logger.debug(f"Cámara denegada para: {origin_str}")
-
         elif feature == QWebEnginePage.Feature.FullScreen:
             # Solicitud de pantalla completa (permitir siempre)
-            self.page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionGrantedByUser)
-            logger.debug(f"Pantalla completa concedida para: {origin_str}")
+            self._page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionGrantedByUser)
+            logger.debug("Pantalla completa concedida para: %s", origin_str)
             
         else:
             # Para otros permisos, denegar por defecto (principio de menor privilegio)
-            self.page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionDeniedByUser)
-            logger.debug(f"Permiso {feature} denegado para: {origin_str}")
+            self._page.setFeaturePermission(security_origin, feature, QWebEnginePage.PermissionPolicy.PermissionDeniedByUser)
+            logger.debug("Permiso %s denegado para: %s", feature, origin_str)
 
     def handle_fullscreen_request(self, request: QWebEngineFullScreenRequest) -> None:
         """
@@ -156,7 +399,8 @@ class BrowserEngine(QWebEngineView):
         Acepta automáticamente la solicitud para permitir que el elemento (ej. video) ocupe la pantalla.
         """
         request.accept()
-        logger.debug(f"Solicitud de pantalla completa aceptada para: {request.origin().toString()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Solicitud de pantalla completa aceptada para: %s", request.origin().toString())
     
     def force_https_redirect(self, url: QUrl) -> None:
         """
@@ -167,25 +411,28 @@ class BrowserEngine(QWebEngineView):
             url: URL a verificar y posiblemente redirigir
         """
         if url.scheme() == "http" and url.host():
-            # Protección contra loops infinitos
-            if self._last_redirect_url == url:
-                self._https_redirect_count += 1
-                if self._https_redirect_count > 3:
-                    logger.warning(f"Demasiadas redirecciones HTTPS para {url.toString()}. Deteniendo redirección.")
-                    return
-            else:
-                self._https_redirect_count = 0
-                self._last_redirect_url = url
+            # Protección contra loops (A -> A o A -> B -> C -> A): si esta
+            # dirección ya se redirigió sin que ninguna carga terminase, el
+            # servidor nos está devolviendo a HTTP
+            redirect_key = url.host() + url.path()
+            if redirect_key in self._recent_redirects:
+                logger.warning("Loop de redirecciones HTTPS detectado en %s. Deteniendo redirección.", url.toString())
+                return
+            self._recent_redirects[redirect_key] = None
+            if len(self._recent_redirects) > _REDIRECT_HISTORY_SIZE:
+                self._recent_redirects.popitem(last=False)
             
             # Redirigir HTTP a HTTPS
             secure_url = QUrl(url)
             secure_url.setScheme("https")
-            logger.debug(f"Redirigiendo HTTP a HTTPS: {url.toString()} -> {secure_url.toString()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Redirigiendo HTTP a HTTPS: %s -> %s", url.toString(), secure_url.toString())
             self.setUrl(secure_url)
-        else:
-            # Resetear contador si no es HTTP
-            self._https_redirect_count = 0
-            self._last_redirect_url = None
+    
+    def _clear_redirect_history(self, ok: bool) -> None:
+        """Olvida las redirecciones recientes cuando una página carga por completo"""
+        if ok:
+            self._recent_redirects.clear()
     
     def set_camera_enabled(self, enabled: bool) -> None:
         """
@@ -194,11 +441,14 @@ class BrowserEngine(QWebEngineView):
         Args:
             enabled: True para habilitar, False para deshabilitar
         """
+        if enabled == self.camera_enabled:
+            # Sin cambios: evitar recargas por señales repetidas
+            return
         self.camera_enabled = enabled
         if not enabled:
             # Revocar todos los permisos de cámara concedidos
             self.revoke_camera_permissions()
-        logger.info(f"Cámara {'habilitada' if enabled else 'deshabilitada'}")
+        logger.info("Cámara %s", 'habilitada' if enabled else 'deshabilitada')
     
     def set_microphone_enabled(self, enabled: bool) -> None:
         """
@@ -207,32 +457,48 @@ class BrowserEngine(QWebEngineView):
         Args:
             enabled: True para habilitar, False para deshabilitar
         """
+        if enabled == self.microphone_enabled:
+            # Sin cambios: evitar recargas por señales repetidas
+            return
         self.microphone_enabled = enabled
         if not enabled:
             # Revocar todos los permisos de micrófono concedidos
             self.revoke_microphone_permissions()
-        logger.info(f"Micrófono {'habilitado' if enabled else 'deshabilitado'}")
+        logger.info("Micrófono %s", 'habilitado' if enabled else 'deshabilitado')
     
     def revoke_camera_permissions(self) -> None:
         """Revoca todos los permisos de cámara concedidos en la sesión activa"""
-        # Nota: PyQt6 no tiene una API directa para revocar permisos específicos
-        # La mejor práctica es recargar la página o navegar a una nueva URL
-        current_url = self.url()
-        if not current_url.isEmpty():
-            self.reload()
-            logger.debug("Permisos de cámara revocados (página recargada)")
+        if self._camera_granted_once:
+            self._camera_granted_once = False
+            self._revoke_permissions("cámara")
     
     def revoke_microphone_permissions(self) -> None:
         """Revoca todos los permisos de micrófono concedidos en la sesión activa"""
-        current_url = self.url()
-        if not current_url.isEmpty():
-            self.reload()
-            logger.debug("Permisos de micrófono revocados (página recargada)")
+        if self._mic_granted_once:
+            self._mic_granted_once = False
+            self._revoke_permissions("micrófono")
     
-
+    def _revoke_permissions(self, feature_name: str) -> None:
+        """
+        Revoca los permisos concedidos recargando la página
+        
+        Args:
+            feature_name: Nombre del permiso (solo para el log)
+        """
+        # Nota: PyQt6 no tiene una API directa para revocar permisos específicos
+        # La mejor práctica es recargar la página o navegar a una nueva URL
+        if not self.url().isEmpty():
+            self.reload()
+            logger.debug("Permisos de %s revocados (página recargada)", feature_name)
     
     def clear_all_data(self) -> None:
         """Limpia todos los datos: caché, cookies, permisos, etc."""
+        # Bloquear cámara y micrófono sin recargar: la recarga final ya
+        # revoca cualquier permiso concedido
+        self.camera_enabled = False
+        self.microphone_enabled = False
+        self._camera_granted_once = False
+        self._mic_granted_once = False
         # Limpiar caché del perfil
         self.profile.clearHttpCache()
         # Recargar página para limpiar estado
@@ -240,10 +506,33 @@ class BrowserEngine(QWebEngineView):
         logger.info("Todos los datos limpiados")
     
     def rotate_user_agent(self) -> None:
-        """Rota el User-Agent a uno aleatorio de la lista"""
-        new_user_agent = random.choice(self.user_agents)
+        """Rota el User-Agent al siguiente de la secuencia aleatoria"""
+        new_user_agent = next(self._ua_cycle)
         self.profile.setHttpUserAgent(new_user_agent)
-        logger.debug(f"User-Agent rotado: {new_user_agent[:50]}...")
+        logger.debug("User-Agent rotado: %.50s...", new_user_agent)
+
+
+class _TorJobSignals(QObject):
+    """Señales de _TorPrepareJob (un QRunnable no puede emitir señales)"""
+    finished = pyqtSignal(bool)
+
+
+class _TorPrepareJob(QRunnable):
+    """Inicia y verifica Tor en el QThreadPool global, fuera del hilo de la UI"""
+    
+    def __init__(self, tor_manager: 'TorManager'):
+        super().__init__()
+        self.tor_manager = tor_manager
+        self.signals = _TorJobSignals()
+    
+    def run(self) -> None:
+        try:
+            ready = self.tor_manager.prepare_tor()
+        except Exception as e:
+            logger.error("Error al preparar Tor: %s", e)
+            ready = False
+        # Se entrega en el hilo de la UI (el receptor vive allí)
+        self.signals.finished.emit(ready)
 
 
 class BrowserWindow(QMainWindow):
@@ -261,15 +550,24 @@ class BrowserWindow(QMainWindow):
         self.setGeometry(100, 100, config.window_width, config.window_height)
         
         # Configurar icono de la aplicación
-        icon_path = os.path.join(os.path.dirname(__file__), "assets", "app_icon.png")
-        if os.path.exists(icon_path):
-            self.setWindowIcon(QIcon(icon_path))
-            logger.info(f"Icono cargado desde: {icon_path}")
+        icon = _app_icon()
+        if icon is not None:
+            self.setWindowIcon(icon)
+            logger.info("Icono cargado desde: %s", _ICON_PATH)
         else:
-            logger.warning(f"No se encontró el icono en: {icon_path}")
+            logger.warning("No se encontró el icono en: %s", _ICON_PATH)
+        
+        # Pestaña activa (se actualiza en on_tab_changed)
+        self._current_browser: Optional[BrowserEngine] = None
+        # Pestañas abiertas, en el mismo orden que en self.tabs
+        self._browsers: List[BrowserEngine] = []
+        # Pestañas cerradas listas para reutilizar (evita arrancar un nuevo
+        # proceso de renderizado por pestaña)
+        self._tab_pool: 'deque[BrowserEngine]' = deque()
+        # Última URL mostrada en la barra de direcciones
+        self._last_url_bar_url: Optional[QUrl] = None
         
         # Crear widget central con pestañas
-        from PyQt6.QtWidgets import QTabWidget, QToolButton
         self.tabs = QTabWidget()
         self.tabs.setDocumentMode(True)
         self.tabs.setTabsClosable(True)
@@ -285,8 +583,13 @@ class BrowserWindow(QMainWindow):
         
         self.setCentralWidget(self.tabs)
         
-        # Crear gestor de Tor (compartido)
-        self.tor_manager = TorManager(debug_mode=config.debug_mode)
+        # Gestor de Tor (compartido). Se crea al activar Tor por primera vez
+        # para no cargar stem durante el arranque
+        self.tor_manager: Optional['TorManager'] = None
+        # Arranque de Tor en curso (ver toggle_tor)
+        self._tor_job: Optional[_TorPrepareJob] = None
+        # El arranque en curso se canceló: su resultado se descarta
+        self._tor_job_cancelled = False
         
         # Crear barra de herramientas
         self.create_toolbar()
@@ -304,59 +607,111 @@ class BrowserWindow(QMainWindow):
         # Configurar atajos de teclado
         self.setup_shortcuts()
         
-        # Cargar primera pestaña
-        self.add_new_tab(QUrl(config.default_homepage), "Inicio")
+        # Cargar primera pestaña (la navegación empieza tras pintar la ventana)
+        self.add_new_tab(QUrl(config.default_homepage), "Inicio", defer_load=True)
         
         logger.info("BrowserWindow inicializada con soporte de pestañas")
     
+    def get_tor_manager(self) -> 'TorManager':
+        """Retorna el gestor de Tor, creándolo en el primer uso"""
+        if self.tor_manager is None:
+            from .tor_logic import TorManager
+            self.tor_manager = TorManager(debug_mode=self.config.debug_mode)
+        return self.tor_manager
+
     def current_browser(self) -> Optional[BrowserEngine]:
         """Retorna el motor del navegador de la pestaña actual"""
-        return self.tabs.currentWidget()
+        return self._current_browser
 
-    def add_new_tab(self, url: QUrl = None, label: str = "Nueva Pestaña") -> None:
-        """Crea y añade una nueva pestaña"""
+    def add_new_tab(self, url: QUrl = None, label: str = "Nueva Pestaña", defer_load: bool = False) -> None:
+        """
+        Crea y añade una nueva pestaña
+        
+        Args:
+            url: URL inicial. Si es None, usa la página de inicio configurada
+            label: Texto inicial de la pestaña
+            defer_load: Si es True, la carga se inicia en la siguiente iteración
+                del bucle de eventos para que la ventana se pinte antes
+        """
         if url is None:
             url = QUrl(self.config.default_homepage)
             
-        browser = BrowserEngine(debug_mode=self.config.debug_mode)
-        browser.setUrl(url)
+        if self._tab_pool:
+            # Reutilizar una pestaña cerrada: sus señales siguen conectadas
+            browser = self._tab_pool.pop()
+            browser.history().clear()
+            browser._last_title = None
+            browser.rotate_user_agent()
+        else:
+            browser = self._create_browser()
+        
+        if defer_load:
+            QTimer.singleShot(0, lambda: browser.setUrl(url))
+        else:
+            browser.setUrl(url)
         
         # Aplicar estado global de toggles a la nueva pestaña
         # Nota: Leemos el estado del toggle, no del browser actual (que podría no existir si es el primero)
         browser.set_camera_enabled(self.camera_toggle.isChecked())
         browser.set_microphone_enabled(self.microphone_toggle.isChecked())
         
-        # Conectar señales
-        browser.loadProgress.connect(lambda p: self.update_progress(p, browser))
-        browser.loadFinished.connect(lambda s: self.on_load_finished(s, browser))
-        browser.urlChanged.connect(lambda u: self.update_url_bar(u, browser))
-        browser.titleChanged.connect(lambda t: self.update_tab_title(t, browser))
-        
-        # Si Tor está activo, configurar proxy (ya es global, no es necesario por pestaña)
-        if self.tor_toggle.isChecked():
-             # El proxy global ya está configurado
-             pass
+        # Si Tor está activo, el proxy es global: no hay nada que configurar por pestaña
 
         index = self.tabs.addTab(browser, label)
+        browser._tab_index = index
+        self._browsers.append(browser)
         self.tabs.setCurrentIndex(index)
         
-        logger.info(f"Nueva pestaña añadida (Índice: {index})")
+        logger.info("Nueva pestaña añadida (Índice: %s)", index)
+
+    def _create_browser(self) -> BrowserEngine:
+        """Crea un BrowserEngine y conecta sus señales con la ventana"""
+        browser = BrowserEngine(debug_mode=self.config.debug_mode, config=self.config)
+        
+        # Conectar señales (se guardan para desconectarlas en _discard_browser)
+        browser._connections = [
+            browser.loadProgress.connect(lambda p: self.update_progress(p, browser)),
+            browser.loadFinished.connect(lambda s: self.on_load_finished(s, browser)),
+            browser.urlChanged.connect(lambda u: self.update_url_bar(u, browser)),
+            browser.titleChanged.connect(lambda t: self.update_tab_title(t, browser)),
+        ]
+        return browser
+
+    def _discard_browser(self, browser: BrowserEngine) -> None:
+        """Desconecta las señales de la pestaña y la destruye"""
+        # Soltar ya las lambdas que referencian la pestaña, sin esperar a deleteLater
+        for connection in browser._connections:
+            QObject.disconnect(connection)
+        browser._connections.clear()
+        browser.deleteLater()
 
     def close_tab(self, index: int) -> None:
         """Cierra la pestaña en el índice especificado"""
         if self.tabs.count() < 2:
             return # No cerrar la última pestaña (o se podría cerrar la app)
 
-        widget = self.tabs.widget(index)
-        if widget:
-            widget.deleteLater()
-            
+        browser = self._browsers.pop(index)
         self.tabs.removeTab(index)
-        logger.info(f"Pestaña cerrada (Índice: {index})")
+        # Las pestañas posteriores se desplazan una posición
+        for i in range(index, len(self._browsers)):
+            self._browsers[i]._tab_index = i
+        
+        if len(self._tab_pool) < _TAB_POOL_SIZE:
+            # Aparcar la pestaña en una página vacía para reutilizarla
+            browser.stop()
+            browser._tab_index = -1
+            browser.setUrl(QUrl("about:blank"))
+            self._tab_pool.append(browser)
+        else:
+            self._discard_browser(browser)
+        logger.info("Pestaña cerrada (Índice: %s)", index)
 
     def on_tab_changed(self, index: int) -> None:
         """Maneja el cambio de pestaña activa"""
         browser = self.tabs.widget(index)
+        self._current_browser = browser
+        # La barra puede contener texto escrito a mano: forzar su actualización
+        self._last_url_bar_url = None
         if browser:
             self.update_url_bar(browser.url(), browser)
             self.update_title(browser.title())
@@ -364,42 +719,50 @@ class BrowserWindow(QMainWindow):
 
     def update_tab_title(self, title: str, browser: BrowserEngine) -> None:
         """Actualiza el título de la pestaña específica"""
-        index = self.tabs.indexOf(browser)
+        if title == browser._last_title:
+            return
+        browser._last_title = title
+        
+        index = browser._tab_index
         if index != -1:
             # Truncar título si es muy largo
             short_title = (title[:20] + '..') if len(title) > 20 else title
             self.tabs.setTabText(index, short_title)
             self.tabs.setTabToolTip(index, title)
             
-            if browser == self.current_browser():
+            if browser is self._current_browser:
                 self.update_title(title)
 
     def create_toolbar(self) -> None:
         """Crea la barra de herramientas con toggles y controles"""
+        # Estilo de los toggles: una sola hoja de estilo para toda la ventana
+        self.setStyleSheet(_TOGGLE_STYLESHEET)
+        
+        # La barra se monta fuera de la ventana y sin repintados; se añade al
+        # final para que Qt calcule el layout una sola vez
         toolbar = QToolBar("Barra Principal")
         toolbar.setMovable(False)
-        self.addToolBar(toolbar)
+        toolbar.setUpdatesEnabled(False)
         
         # Botón Atrás
         back_action = QAction("◀ Atrás", self)
         back_action.setShortcut(QKeySequence("Alt+Left"))
         back_action.triggered.connect(lambda: self.current_browser() and self.current_browser().back())
         back_action.setToolTip("Ir atrás (Alt+←)")
-        toolbar.addAction(back_action)
         
         # Botón Adelante
         forward_action = QAction("Adelante ▶", self)
         forward_action.setShortcut(QKeySequence("Alt+Right"))
         forward_action.triggered.connect(lambda: self.current_browser() and self.current_browser().forward())
         forward_action.setToolTip("Ir adelante (Alt+→)")
-        toolbar.addAction(forward_action)
         
         # Botón Recargar
         reload_action = QAction("🔄 Recargar", self)
         reload_action.setShortcut(QKeySequence("F5"))
         reload_action.triggered.connect(lambda: self.current_browser() and self.current_browser().reload())
         reload_action.setToolTip("Recargar página (F5)")
-        toolbar.addAction(reload_action)
+        
+        toolbar.addActions([back_action, forward_action, reload_action])
 
         toolbar.addSeparator()
 
@@ -434,16 +797,7 @@ class BrowserWindow(QMainWindow):
         self.tor_toggle.setChecked(False)
         self.tor_toggle.clicked.connect(self.toggle_tor)
         self.tor_toggle.setToolTip("Activar/desactivar navegación a través de Tor")
-        self.tor_toggle.setStyleSheet("""
-            QPushButton:checked {
-                background-color: #4caf50;
-                color: white;
-            }
-            QPushButton:!checked {
-                background-color: #757575;
-                color: white;
-            }
-        """)
+        self.tor_toggle.setObjectName("torToggle")
         toolbar.addWidget(self.tor_toggle)
         
         # Botón para nueva identidad de Tor
@@ -460,16 +814,7 @@ class BrowserWindow(QMainWindow):
         self.camera_toggle.setChecked(False)
         self.camera_toggle.clicked.connect(self.toggle_camera)
         self.camera_toggle.setToolTip("Permitir/bloquear acceso a la cámara")
-        self.camera_toggle.setStyleSheet("""
-            QPushButton:checked {
-                background-color: #4caf50;
-                color: white;
-            }
-            QPushButton:!checked {
-                background-color: #f44336;
-                color: white;
-            }
-        """)
+        self.camera_toggle.setObjectName("cameraToggle")
         toolbar.addWidget(self.camera_toggle)
         
         # Toggle de Micrófono
@@ -478,16 +823,7 @@ class BrowserWindow(QMainWindow):
         self.microphone_toggle.setChecked(False)
         self.microphone_toggle.clicked.connect(self.toggle_microphone)
         self.microphone_toggle.setToolTip("Permitir/bloquear acceso al micrófono")
-        self.microphone_toggle.setStyleSheet("""
-            QPushButton:checked {
-                background-color: #4caf50;
-                color: white;
-            }
-            QPushButton:!checked {
-                background-color: #f44336;
-                color: white;
-            }
-        """)
+        self.microphone_toggle.setObjectName("microphoneToggle")
         toolbar.addWidget(self.microphone_toggle)
         
         toolbar.addSeparator()
@@ -498,6 +834,9 @@ class BrowserWindow(QMainWindow):
         clear_action.triggered.connect(self.clear_all)
         clear_action.setToolTip("Limpiar todos los datos (Ctrl+Shift+Del)")
         toolbar.addAction(clear_action)
+        
+        toolbar.setUpdatesEnabled(True)
+        self.addToolBar(toolbar)
     
     def setup_shortcuts(self) -> None:
         """Configura los atajos de teclado"""
@@ -515,7 +854,7 @@ class BrowserWindow(QMainWindow):
     
     def update_progress(self, progress: int, browser: BrowserEngine) -> None:
         """Actualiza la barra de progreso si es la pestaña activa"""
-        if browser != self.current_browser():
+        if browser is not self._current_browser:
             return
             
         if progress < 100:
@@ -526,7 +865,7 @@ class BrowserWindow(QMainWindow):
     
     def on_load_finished(self, success: bool, browser: BrowserEngine) -> None:
         """Se llama cuando termina de cargar una página"""
-        if browser != self.current_browser():
+        if browser is not self._current_browser:
             return
 
         if not success:
@@ -535,62 +874,25 @@ class BrowserWindow(QMainWindow):
         else:
             self.status_bar.showMessage("Página cargada", 2000)
     
-    # ... (is_ip_address y validate_url se mantienen igual que pertenecen a la clase pero son utilitarios)
-    def is_ip_address(self, text: str) -> bool:
-        """Verifica si un texto es una dirección IP válida"""
-        ip_pattern = r'^(\d{1,3}\.){3}\d{1,3}$'
-        if re.match(ip_pattern, text):
-            parts = text.split('.')
-            return all(0 <= int(part) <= 255 for part in parts)
-        return False
-    
-    def validate_url(self, url_string: str) -> Optional[QUrl]:
-        """Valida y normaliza una URL o convierte búsqueda a URL"""
-        if not url_string or not url_string.strip():
-            return None
-        
-        url_string = url_string.strip()
-        
-        if (not any(c in url_string for c in ['.', '/', ':']) and 
-            not self.is_ip_address(url_string) and
-            not url_string.startswith(('http://', 'https://', 'file://'))):
-            search_url = f"https://duckduckgo.com/?q={url_string.replace(' ', '+')}"
-            logger.debug(f"Búsqueda convertida a URL: {search_url}")
-            return QUrl(search_url)
-        
-        if not url_string.startswith(('http://', 'https://', 'file://')):
-            url_string = 'https://' + url_string
-        
-        url = QUrl(url_string)
-        
-        if not url.isValid() or url.isEmpty():
-            logger.warning(f"URL inválida: {url_string}")
-            return None
-        
-        scheme = url.scheme().lower()
-        if scheme in ['javascript', 'data', 'vbscript']:
-            logger.warning(f"URL bloqueada por esquema peligroso: {scheme}")
-            return None
-        
-        return url
-    
     def navigate_to_url(self) -> None:
         """Navega a la URL introducida en la barra de direcciones"""
         url_text = self.url_bar.text()
-        url = self.validate_url(url_text)
+        url = validate_url(url_text)
         browser = self.current_browser()
         
         if url and browser:
             browser.setUrl(url)
-            logger.info(f"Navegando a: {url.toString()}")
+            logger.info("Navegando a: %s", url.toString())
         else:
             self.status_bar.showMessage("URL inválida o no permitida", 3000)
-            logger.warning(f"Intento de navegar a URL inválida: {url_text}")
+            logger.warning("Intento de navegar a URL inválida: %s", url_text)
     
     def update_url_bar(self, url: QUrl, browser: BrowserEngine) -> None:
         """Actualiza la barra de direcciones cuando cambia la URL"""
-        if browser == self.current_browser():
-            self.url_bar.setText(url.toString())
+        if browser is not self._current_browser or url == self._last_url_bar_url:
+            return
+        self.url_bar.setText(url.toString())
+        self._last_url_bar_url = url
     
     def update_title(self, title: str) -> None:
         """Actualiza el título de la ventana"""
@@ -598,11 +900,11 @@ class BrowserWindow(QMainWindow):
     
     def toggle_camera(self, checked: bool) -> None:
         """Maneja el toggle de cámara (Global)"""
+        # Agrupar los cambios de la ventana en un solo repintado
+        self.setUpdatesEnabled(False)
         # Actualizar todas las pestañas
-        for i in range(self.tabs.count()):
-            browser = self.tabs.widget(i)
-            if isinstance(browser, BrowserEngine):
-                browser.set_camera_enabled(checked)
+        for browser in self._browsers:
+            browser.set_camera_enabled(checked)
                 
         if checked:
             self.camera_toggle.setText("📷 Cámara: PERMITIDA")
@@ -610,14 +912,16 @@ class BrowserWindow(QMainWindow):
         else:
             self.camera_toggle.setText("📷 Cámara: BLOQUEADA")
             self.status_bar.showMessage("Cámara bloqueada para TODAS las pestañas", 3000)
+        
+        self.setUpdatesEnabled(True)
     
     def toggle_microphone(self, checked: bool) -> None:
         """Maneja el toggle de micrófono (Global)"""
+        # Agrupar los cambios de la ventana en un solo repintado
+        self.setUpdatesEnabled(False)
         # Actualizar todas las pestañas
-        for i in range(self.tabs.count()):
-            browser = self.tabs.widget(i)
-            if isinstance(browser, BrowserEngine):
-                browser.set_microphone_enabled(checked)
+        for browser in self._browsers:
+            browser.set_microphone_enabled(checked)
 
         if checked:
             self.microphone_toggle.setText("🎤 Micrófono: PERMITIDO")
@@ -625,134 +929,103 @@ class BrowserWindow(QMainWindow):
         else:
             self.microphone_toggle.setText("🎤 Micrófono: BLOQUEADO")
             self.status_bar.showMessage("Micrófono bloqueado para TODAS las pestañas", 3000)
+        
+        self.setUpdatesEnabled(True)
     
     def toggle_tor(self, checked: bool) -> None:
         """Maneja el toggle de Tor (Global)"""
         if checked:
             # 0. Estado visual: Conectando (Naranja)
-            self.tor_toggle.setStyleSheet("""
-                QPushButton:checked { background-color: #d35400; color: white; }
-                QPushButton:!checked { background-color: #757575; color: white; }
-            """)
+            self._set_tor_connecting(True)
             self.tor_toggle.setText("🔒 Tor: ...")
             
             # 1. Mostrar página de "Conectando..."
-            loading_html = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <style>
-                    body { font-family: 'Segoe UI', sans-serif; background-color: #2b2b2b; color: #ffffff; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; }
-                    .container { text-align: center; }
-                    .loader { border: 5px solid #333; border-top: 5px solid #d35400; border-radius: 50%; width: 50px; height: 50px; animation: spin 1s linear infinite; margin: 0 auto 20px; }
-                    @keyframes spin { 0% { transform: rotate(0deg); } 100% { transform: rotate(360deg); } }
-                    h2 { color: #d35400; }
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="loader"></div>
-                    <h2>Conectando a Tor...</h2>
-                    <p>Estableciendo circuito seguro. Por favor, espere unos segundos.</p>
-                </div>
-            </body>
-            </html>
-            """
             if self.current_browser():
-                self.current_browser().setHtml(loading_html)
-            
-            # Forzar actualización de UI para que se vea el mensaje y el botón naranja
-            for _ in range(10):
-                QApplication.processEvents()
-                import time
-                time.sleep(0.05)
+                self.current_browser().setHtml(_TOR_LOADING_HTML)
             
-            # 2. Intentar conectar
-            if self.tor_manager.enable_tor():
-                # 3. Mostrar página de éxito PRIMERO
-                success_html = """
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <style>
-                        body { font-family: 'Segoe UI', sans-serif; background-color: #2b2b2b; color: #ffffff; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; }
-                        .container { text-align: center; }
-                        .icon { font-size: 64px; color: #2ecc71; margin-bottom: 20px; }
-                        h2 { color: #2ecc71; }
-                        .btn { background-color: #3498db; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; display: inline-block; margin-top: 20px; text-decoration: none; cursor: pointer; }
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="icon">🔒</div>
-                        <h2>Conexión Segura Establecida</h2>
-                        <p>Ahora navegas a través de la red Tor.</p>
-                        <p>Tu IP es anónima.</p>
-                        <a href="https://check.torproject.org" class="btn">Verificar mi IP</a>
-                    </div>
-                </body>
-                </html>
-                """
-                if self.current_browser():
-                    self.current_browser().setHtml(success_html)
-                
-                # Dar tiempo a renderizar HTML antes de poner botón verde
-                for _ in range(5):
-                    QApplication.processEvents()
-                    time.sleep(0.05)
-
-                # 4. Estado visual: Conectado (Verde)
-                self.tor_toggle.setStyleSheet("""
-                    QPushButton:checked { background-color: #4caf50; color: white; }
-                    QPushButton:!checked { background-color: #757575; color: white; }
-                """)
-                self.tor_toggle.setText("🔒 Tor: ON")
-                self.status_bar.showMessage("Tor activado para TODAS las pestañas", 3000)
-                    
-            else:
-                self.tor_toggle.setChecked(False)
-                # Restaurar estilo (aunque al estar unchecked se verá gris)
-                self.tor_toggle.setStyleSheet("""
-                    QPushButton:checked { background-color: #4caf50; color: white; }
-                    QPushButton:!checked { background-color: #757575; color: white; }
-                """)
-                self.status_bar.showMessage("Error: No se pudo iniciar Tor.", 5000)
-                
-                # 4. Mostrar página de error
-                error_html = """
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <style>
-                        body { font-family: 'Segoe UI', sans-serif; background-color: #2b2b2b; color: #ffffff; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; }
-                        .container { text-align: center; max-width: 600px; padding: 20px; }
-                        .icon { font-size: 64px; color: #e74c3c; margin-bottom: 20px; }
-                        h2 { color: #e74c3c; }
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="icon">❌</div>
-                        <h2>Error al conectar con Tor</h2>
-                        <p>No se pudo iniciar el proceso Tor.</p>
-                    </div>
-                </body>
-                </html>
-                """
-                if self.current_browser():
-                     self.current_browser().setHtml(error_html)
-                     
-                logger.error("Error al habilitar Tor. Si no tienes Tor instalado, descárgalo de https://www.torproject.org/")
+            # 2. Arrancar y verificar Tor en segundo plano: la UI sigue
+            # respondiendo y el resultado llega a _on_tor_prepared. Si aún
+            # queda un arranque cancelado, _on_tor_prepared lanzará uno nuevo
+            if self._tor_job is None:
+                self._start_tor_job()
         else:
-            if self.tor_manager.disable_tor():
+            if self._tor_job is not None:
+                # No seguir esperando un arranque que ya no se quiere
+                self._tor_job_cancelled = True
+                self.tor_manager.cancel_launch()
+            if self.tor_manager is not None and self.tor_manager.disable_tor():
                 self.tor_toggle.setText("🔒 Tor: OFF")
                 self.status_bar.showMessage("Tor desactivado", 3000)
                 if self.current_browser():
                     self.current_browser().reload()
     
+    def _start_tor_job(self) -> None:
+        """Encola en el QThreadPool un _TorPrepareJob nuevo"""
+        tor_manager = self.get_tor_manager()
+        # Rearmar desde el hilo de la UI: hacerlo en el trabajo borraría un
+        # cancel_launch llegado antes de que el pool lo ejecute
+        tor_manager.reset_launch()
+        self._tor_job_cancelled = False
+        self._tor_job = _TorPrepareJob(tor_manager)
+        self._tor_job.signals.finished.connect(self._on_tor_prepared)
+        QThreadPool.globalInstance().start(self._tor_job)
+    
+    def closeEvent(self, event: QCloseEvent) -> None:
+        """Aborta un arranque de Tor pendiente para que el QThreadPool no bloquee la salida"""
+        if self._tor_job is not None:
+            self.tor_manager.cancel_launch()
+        super().closeEvent(event)
+    
+    def _set_tor_connecting(self, connecting: bool) -> None:
+        """Marca el toggle de Tor como "conectando" (naranja) sin cambiar su hoja de estilo"""
+        self.tor_toggle.setProperty("connecting", connecting)
+        # Las propiedades dinámicas solo se reevalúan al repulir el widget
+        style = self.tor_toggle.style()
+        style.unpolish(self.tor_toggle)
+        style.polish(self.tor_toggle)
+    
+    def _on_tor_prepared(self, ready: bool) -> None:
+        """Activa el proxy de Tor y muestra la página de éxito o de error"""
+        self._tor_job = None
+        if self._tor_job_cancelled:
+            # Resultado de un arranque cancelado: si el usuario volvió a
+            # activar Tor entretanto, empezar ahora uno nuevo
+            if self.tor_toggle.isChecked():
+                self._start_tor_job()
+            else:
+                self._set_tor_connecting(False)
+            return
+        if not self.tor_toggle.isChecked():
+            # El usuario desactivó Tor mientras se conectaba
+            self._set_tor_connecting(False)
+            return
+        
+        if ready:
+            self.tor_manager.activate_proxy()
+            # 3. Mostrar página de éxito PRIMERO
+            if self.current_browser():
+                self.current_browser().setHtml(_TOR_SUCCESS_HTML)
+
+            # 4. Estado visual: Conectado (Verde)
+            self._set_tor_connecting(False)
+            self.tor_toggle.setText("🔒 Tor: ON")
+            self.status_bar.showMessage("Tor activado para TODAS las pestañas", 3000)
+                
+        else:
+            self.tor_toggle.setChecked(False)
+            # Restaurar estilo (aunque al estar unchecked se verá gris)
+            self._set_tor_connecting(False)
+            self.status_bar.showMessage("Error: No se pudo iniciar Tor.", 5000)
+            
+            # 4. Mostrar página de error
+            if self.current_browser():
+                self.current_browser().setHtml(_TOR_ERROR_HTML)
+                 
+            logger.error("Error al habilitar Tor. Si no tienes Tor instalado, descárgalo de https://www.torproject.org/")
+    
     def new_tor_identity(self) -> None:
         """Solicita una nueva identidad de Tor"""
-        if self.tor_manager.get_new_identity():
+        if self.tor_manager is not None and self.tor_manager.get_new_identity():
             self.status_bar.showMessage("Nueva identidad de Tor solicitada", 3000)
         else:
             self.status_bar.showMessage("Error al solicitar identidad.", 5000)
@@ -760,12 +1033,11 @@ class BrowserWindow(QMainWindow):
     def clear_all(self) -> None:
         """Limpia todo y borra rastro en RAM (Global)"""
         # Limpiar todas las pestañas
-        for i in range(self.tabs.count()):
-            browser = self.tabs.widget(i)
-            if isinstance(browser, BrowserEngine):
-                browser.clear_all_data()
-                browser.set_camera_enabled(False)
-                browser.set_microphone_enabled(False)
+        for browser in self._browsers:
+            browser.clear_all_data()
+        # Las pestañas aparcadas conservan su historial: descartarlas
+        while self._tab_pool:
+            self._discard_browser(self._tab_pool.pop())
         
         # Resetear toggles
         self.camera_toggle.setChecked(False)
@@ -2,17 +2,39 @@
 Sistema de configuración centralizado para UltraBrowser
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, replace
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import ClassVar, List, Optional, Tuple
 import json
+import os
+
+try:
+    import orjson as _json
+except ImportError:  # orjson es opcional: usar la biblioteca estándar
+    _json = json
+
 from .exceptions import ConfigFileNotFoundError, ConfigFileInvalidError
 from .logging_config import get_logger
+from .utils import ensure_dir
+
+logger = get_logger(__name__)
 
-logger = get_logger()
+# Rutas por defecto (Path es inmutable: se comparte entre instancias)
+_DEFAULT_USER_AGENTS_FILE = Path("config/user_agents.json")
+_DEFAULT_LOG_FILE = Path("logs/ultrabrowser.log")
 
+# User-Agents usados si el archivo no existe o no tiene el formato esperado
+DEFAULT_USER_AGENTS: Tuple[str, ...] = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
+)
 
-@dataclass
+
+@dataclass(slots=True)
 class TorConfig:
     """Configuración específica de Tor"""
     socks_port: int = 9050
@@ -20,10 +42,11 @@ class TorConfig:
     host: str = "127.0.0.1"
     timeout: int = 10
     retry_attempts: int = 3
+    bootstrap_timeout: int = 90  # segundos para que un Tor lanzado llegue al 100%
     tor_binary_path: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class BrowserConfig:
     """Configuración principal del navegador"""
     # Tor
@@ -41,24 +64,31 @@ class BrowserConfig:
     webrtc_public_only: bool = True
     
     # User-Agents
-    user_agents_file: Path = field(default_factory=lambda: Path("config/user_agents.json"))
+    user_agents_file: Path = _DEFAULT_USER_AGENTS_FILE
     rotate_user_agent: bool = True
     user_agent_rotation_interval: int = 30  # minutos
     
     # Debug
     debug_mode: bool = False
-    log_file: Optional[Path] = field(default_factory=lambda: Path("logs/ultrabrowser.log"))
+    log_file: Optional[Path] = _DEFAULT_LOG_FILE
     
     # UI
     window_width: int = 1200
     window_height: int = 800
     show_status_bar: bool = True
     
+    # Esquema de serialización (precalculado para to_dict)
+    _PATH_FIELDS: ClassVar[Tuple[str, ...]] = ('user_agents_file', 'log_file')
+    _NESTED_FIELDS: ClassVar[Tuple[str, ...]] = ('tor',)
+    
     @classmethod
     def from_file(cls, config_path: Path) -> 'BrowserConfig':
         """
         Carga configuración desde archivo JSON
         
+        El resultado se memoriza por (ruta, mtime, tamaño): mientras el archivo
+        no cambie, las llamadas repetidas no vuelven a leerlo ni parsearlo.
+        
         Args:
             config_path: Ruta al archivo de configuración JSON
             
@@ -69,63 +99,119 @@ class BrowserConfig:
             ConfigFileNotFoundError: Si el archivo no existe
             ConfigFileInvalidError: Si el JSON es inválido
         """
-        if not config_path.exists():
-            raise ConfigFileNotFoundError(f"Archivo de configuración no encontrado: {config_path}")
+        try:
+            stat = config_path.stat()
+        except OSError:
+            # Sin stat no hay clave de caché: _parse reporta el error
+            return cls._parse(config_path)
         
+        cached = _load_config_cached(cls, str(config_path), stat.st_mtime_ns, stat.st_size)
+        # Copia para que el llamador pueda modificarla sin alterar la caché
+        return replace(cached, tor=replace(cached.tor))
+    
+    @classmethod
+    def _parse(cls, config_path: Path) -> 'BrowserConfig':
+        """Lee y parsea el archivo de configuración (sin caché)"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except json.JSONDecodeError as e:
+            data = _json.loads(config_path.read_bytes())
+        except FileNotFoundError as e:
+            raise ConfigFileNotFoundError(f"Archivo de configuración no encontrado: {config_path}") from e
+        except _json.JSONDecodeError as e:
             raise ConfigFileInvalidError(f"JSON inválido en {config_path}: {e}") from e
         except Exception as e:
             raise ConfigFileInvalidError(f"Error al leer {config_path}: {e}") from e
         
-        # Convertir rutas de string a Path
-        if 'user_agents_file' in data:
-            data['user_agents_file'] = Path(data['user_agents_file'])
-        if 'log_file' in data and data['log_file']:
-            data['log_file'] = Path(data['log_file'])
+        if not isinstance(data, dict):
+            raise ConfigFileInvalidError(f"Se esperaba un objeto JSON en {config_path}")
         
-        # Manejar configuración anidada de Tor
-        if 'tor' in data:
-            data['tor'] = TorConfig(**data['tor'])
+        # Una sola pasada: descartar claves desconocidas y convertir tipos
+        kwargs = {}
+        for key, value in data.items():
+            if key not in _BROWSER_FIELD_SET:
+                logger.warning("Clave desconocida en %s ignorada: %s", config_path, key)
+                continue
+            if key == 'tor':
+                # Manejar configuración anidada de Tor
+                if not isinstance(value, dict):
+                    raise ConfigFileInvalidError(f"Se esperaba un objeto en 'tor' en {config_path}")
+                tor_kwargs = {}
+                for tor_key, tor_value in value.items():
+                    if tor_key not in _TOR_FIELD_SET:
+                        logger.warning("Clave desconocida en %s ignorada: tor.%s", config_path, tor_key)
+                        continue
+                    tor_kwargs[tor_key] = tor_value
+                value = TorConfig(**tor_kwargs)
+            elif key in cls._PATH_FIELDS and value is not None:
+                # Convertir rutas de string a Path (null desactiva log_file)
+                if not isinstance(value, str) or not value:
+                    raise ConfigFileInvalidError(f"Ruta inválida en '{key}' en {config_path}: {value!r}")
+                value = Path(value)
+            kwargs[key] = value
         
-        return cls(**data)
+        return cls(**kwargs)
     
     def to_file(self, config_path: Path) -> None:
         """
         Guarda la configuración en un archivo JSON
         
+        El archivo se reemplaza de forma atómica, por lo que un fallo a mitad
+        de escritura nunca deja un config.json truncado.
+        
         Args:
             config_path: Ruta donde guardar el archivo
         """
-        data = self.to_dict()
-        
         # Crear directorio si no existe
-        config_path.parent.mkdir(parents=True, exist_ok=True)
+        ensure_dir(config_path.parent)
         
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        if hasattr(_json, 'OPT_INDENT_2'):
+            # orjson serializa la dataclass directamente, sin pasar por to_dict
+            payload = _json.dumps(self, default=_path_to_str, option=_json.OPT_INDENT_2)
+        else:
+            payload = json.dumps(self.to_dict(), indent=2, ensure_ascii=False).encode('utf-8')
+        
+        # Escritura atómica: archivo temporal + os.replace
+        tmp_path = config_path.with_name(config_path.name + '.tmp')
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, config_path)
     
     def to_dict(self) -> dict:
         """Convierte la configuración a diccionario"""
-        data = {}
-        for key, value in self.__dict__.items():
-            if isinstance(value, Path):
-                data[key] = str(value)
-            elif isinstance(value, TorConfig):
-                data[key] = value.__dict__
-            elif value is None:
-                data[key] = None
-            else:
-                data[key] = value
+        data = {key: getattr(self, key) for key in _BROWSER_FIELDS}
+        for key in self._PATH_FIELDS:
+            value = data[key]
+            data[key] = str(value) if value is not None else None
+        for key in self._NESTED_FIELDS:
+            nested = data[key]
+            data[key] = {name: getattr(nested, name) for name in _TOR_FIELDS}
         return data
 
 
+def _path_to_str(value: object) -> str:
+    """Hook de orjson para los campos Path"""
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+@lru_cache(maxsize=8)
+def _load_config_cached(cls: type, path_str: str, mtime_ns: int, size: int) -> BrowserConfig:
+    """Parsea un archivo de configuración; la clave incluye su mtime y tamaño"""
+    return cls._parse(Path(path_str))
+
+
+# Nombres de campo precalculados (las clases con __slots__ no tienen __dict__)
+_TOR_FIELDS = tuple(f.name for f in fields(TorConfig))
+_BROWSER_FIELDS = tuple(f.name for f in fields(BrowserConfig))
+_TOR_FIELD_SET = frozenset(_TOR_FIELDS)
+_BROWSER_FIELD_SET = frozenset(_BROWSER_FIELDS)
+
+
 def load_user_agents(user_agents_file: Path) -> List[str]:
     """
     Carga la lista de User-Agents desde un archivo JSON
     
+    Como from_file, el contenido se memoriza por (ruta, mtime, tamaño).
+    
     Args:
         user_agents_file: Ruta al archivo JSON con User-Agents
         
@@ -136,31 +222,33 @@ def load_user_agents(user_agents_file: Path) -> List[str]:
         ConfigFileNotFoundError: Si el archivo no existe
         ConfigFileInvalidError: Si el JSON es inválido
     """
-    if not user_agents_file.exists():
-        logger.warning(f"Archivo de User-Agents no encontrado: {user_agents_file}. Usando valores por defecto.")
-        # Retornar User-Agents por defecto
-        return [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
-        ]
+    try:
+        stat = user_agents_file.stat()
+    except OSError:
+        logger.warning("Archivo de User-Agents no encontrado: %s. Usando valores por defecto.", user_agents_file)
+        return list(DEFAULT_USER_AGENTS)
     
+    # Copia: la tupla memorizada no debe exponerse a modificaciones
+    return list(_load_user_agents_cached(str(user_agents_file), stat.st_mtime_ns, stat.st_size))
+
+
+@lru_cache(maxsize=4)
+def _load_user_agents_cached(path_str: str, mtime_ns: int, size: int) -> Tuple[str, ...]:
+    """Lee y parsea un archivo de User-Agents; la clave incluye su mtime y tamaño"""
+    user_agents_file = Path(path_str)
     try:
-        with open(user_agents_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = _json.loads(user_agents_file.read_bytes())
         
         if 'user_agents' in data and isinstance(data['user_agents'], list):
-            return data['user_agents']
+            return tuple(data['user_agents'])
         else:
-            logger.warning(f"Formato inválido en {user_agents_file}. Usando valores por defecto.")
-            return load_user_agents(Path("nonexistent"))  # Retornar defaults
-    except json.JSONDecodeError as e:
-        logger.error(f"Error al parsear JSON en {user_agents_file}: {e}")
+            logger.warning("Formato inválido en %s. Usando valores por defecto.", user_agents_file)
+            return DEFAULT_USER_AGENTS
+    except _json.JSONDecodeError as e:
+        logger.error("Error al parsear JSON en %s: %s", user_agents_file, e)
         raise ConfigFileInvalidError(f"JSON inválido en {user_agents_file}: {e}") from e
     except Exception as e:
-        logger.error(f"Error al leer {user_agents_file}: {e}")
+        logger.error("Error al leer %s: %s", user_agents_file, e)
         raise ConfigFileInvalidError(f"Error al leer {user_agents_file}: {e}") from e
 
 
@@ -3,67 +3,77 @@ Excepciones personalizadas para UltraBrowser
 Sistema de manejo de errores robusto y específico
 """
 
+from typing import final
+
 
 class UltraBrowserError(Exception):
     """Excepción base para todos los errores de UltraBrowser"""
-    pass
+    __slots__ = ()
 
 
 class TorConnectionError(UltraBrowserError):
     """Error al conectar con Tor"""
-    pass
+    __slots__ = ()
 
 
+@final
 class TorNotRunningError(TorConnectionError):
     """Tor no está ejecutándose"""
-    pass
+    __slots__ = ()
 
 
+@final
 class TorProxyError(TorConnectionError):
     """Error con el proxy SOCKS5 de Tor"""
-    pass
+    __slots__ = ()
 
 
+@final
 class TorAuthenticationError(TorConnectionError):
     """Error al autenticar con el controlador de Tor"""
-    pass
+    __slots__ = ()
 
 
 class InvalidURLError(UltraBrowserError):
     """URL inválida o no permitida"""
-    pass
+    __slots__ = ()
 
 
+@final
 class URLValidationError(InvalidURLError):
     """Error al validar una URL"""
-    pass
+    __slots__ = ()
 
 
-class PermissionError(UltraBrowserError):
+class BrowserPermissionError(UltraBrowserError):
     """Error relacionado con permisos"""
-    pass
+    __slots__ = ()
 
 
-class CameraPermissionError(PermissionError):
+@final
+class CameraPermissionError(BrowserPermissionError):
     """Error al acceder a la cámara"""
-    pass
+    __slots__ = ()
 
 
-class MicrophonePermissionError(PermissionError):
+@final
+class MicrophonePermissionError(BrowserPermissionError):
     """Error al acceder al micrófono"""
-    pass
+    __slots__ = ()
 
 
 class ConfigurationError(UltraBrowserError):
     """Error en la configuración"""
-    pass
+    __slots__ = ()
 
 
+@final
 class ConfigFileNotFoundError(ConfigurationError):
     """Archivo de configuración no encontrado"""
-    pass
+    __slots__ = ()
 
 
+@final
 class ConfigFileInvalidError(ConfigurationError):
     """Archivo de configuración inválido"""
-    pass
+    __slots__ = ()
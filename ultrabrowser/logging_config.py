@@ -3,11 +3,49 @@ Sistema de logging profesional para UltraBrowser
 """
 
 import logging
+import queue
 import sys
+import time
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Optional
 
+from .utils import ensure_dir
+
+# Nombre del handler básico que instala el logger por defecto
+_DEFAULT_HANDLER_NAME = 'ultrabrowser-default'
+
+class _SecondCacheFormatter(logging.Formatter):
+    """Formatter que reutiliza la fecha formateada dentro del mismo segundo"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (segundo, texto): una sola tupla para que la lectura sea atómica
+        self._cached_time = (-1, '')
+    
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        second = int(record.created)
+        cached_second, cached_text = self._cached_time
+        if second != cached_second:
+            cached_text = time.strftime(datefmt or self.datefmt, self.converter(second))
+            self._cached_time = (second, cached_text)
+        return cached_text
+
+
+# Formateadores compartidos (funcName/lineno solo en modo debug)
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+_DEBUG_FORMATTER = _SecondCacheFormatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
+    datefmt=_DATE_FORMAT
+)
+_FORMATTER = _SecondCacheFormatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt=_DATE_FORMAT
+)
+
+# Hilo que escribe los logs en disco (se crea en setup_logging)
+_listener: Optional[QueueListener] = None
+
 
 def setup_logging(
     debug_mode: bool = False,
@@ -18,6 +56,9 @@ def setup_logging(
     """
     Configura el sistema de logging para UltraBrowser
     
+    Los mensajes deben usar formato perezoso (logger.debug("x=%s", x)) para
+    no construir el texto cuando el nivel está filtrado.
+    
     Args:
         debug_mode: Si es True, muestra logs DEBUG. Si es False, solo INFO y superiores
         log_file: Ruta opcional para guardar logs en archivo
@@ -34,15 +75,22 @@ def setup_logging(
     logger = logging.getLogger('ultrabrowser')
     logger.setLevel(level)
     
+    # Sustituir el handler básico creado antes de configurar el logging
+    for handler in list(logger.handlers):
+        if handler.get_name() == _DEFAULT_HANDLER_NAME:
+            logger.removeHandler(handler)
+    
     # Evitar duplicación de handlers
     if logger.handlers:
         return logger
     
+    # No rellenar campos de LogRecord que el formato no utiliza
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
     # Formato de los logs
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    formatter = _DEBUG_FORMATTER if debug_mode else _FORMATTER
     
     # Handler para consola
     console_handler = logging.StreamHandler(sys.stdout)
@@ -53,7 +101,7 @@ def setup_logging(
     # Handler para archivo (si se especifica)
     if log_file:
         # Crear directorio si no existe
-        log_file.parent.mkdir(parents=True, exist_ok=True)
+        ensure_dir(log_file.parent)
         
         # Usar RotatingFileHandler para evitar archivos muy grandes
         file_handler = RotatingFileHandler(
@@ -64,37 +112,71 @@ def setup_logging(
         )
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        
+        # La escritura a disco se hace en un hilo aparte: el hilo que
+        # registra el mensaje (p. ej. el de la UI) solo encola el registro
+        global _listener
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        logger.addHandler(QueueHandler(log_queue))
     
     return logger
 
 
-# Logger global (se inicializa en main.py)
-_logger: Optional[logging.Logger] = None
+def shutdown_logging() -> None:
+    """Detiene el hilo de escritura a disco, vaciando los registros pendientes"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
-def get_logger() -> logging.Logger:
+def _create_default_logger() -> logging.Logger:
+    """Crea un logger básico hasta que main.py llame a setup_logging"""
+    logger = logging.getLogger('ultrabrowser')
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.set_name(_DEFAULT_HANDLER_NAME)
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s'
+        ))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return logger
+
+
+# Logger global (se reemplaza en main.py mediante set_logger)
+_logger: logging.Logger = _create_default_logger()
+
+# Atajos ligados al logger 'ultrabrowser'. logging.getLogger devuelve siempre
+# la misma instancia por nombre, y setup_logging configura esa misma, así que
+# siguen siendo válidos después de configurar el logging
+debug = _logger.debug
+info = _logger.info
+warning = _logger.warning
+error = _logger.error
+exception = _logger.exception
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
     """
-    Obtiene el logger global
+    Obtiene el logger global o uno hijo por módulo
+    
+    Los loggers hijos propagan al logger 'ultrabrowser', que es el único con
+    handlers, y permiten silenciar un subsistema concreto
+    (p. ej. logging.getLogger('ultrabrowser.tor_logic').setLevel(...)).
+    
+    Args:
+        name: Nombre del módulo (normalmente __name__). Si es None, devuelve
+            el logger global
     
     Returns:
         Logger configurado
-        
-    Raises:
-        RuntimeError: Si el logger no ha sido inicializado
     """
-    global _logger
-    if _logger is None:
-        # Si no está inicializado, crear uno básico
-        _logger = logging.getLogger('ultrabrowser')
-        if not _logger.handlers:
-            handler = logging.StreamHandler(sys.stdout)
-            handler.setFormatter(logging.Formatter(
-                '%(asctime)s - %(levelname)s - %(message)s'
-            ))
-            _logger.addHandler(handler)
-            _logger.setLevel(logging.INFO)
-    return _logger
+    if name is None:
+        return _logger
+    return _logger.getChild(name.removeprefix(_logger.name + '.'))
 
 
 def set_logger(logger: logging.Logger) -> None:
@@ -7,7 +7,7 @@ import sys
 from pathlib import Path
 from PyQt6.QtWidgets import QApplication
 from .browser_engine import BrowserWindow
-from .logging_config import setup_logging, set_logger
+from .logging_config import setup_logging, set_logger, shutdown_logging
 from .config import BrowserConfig, get_config, set_config, load_user_agents
 from .exceptions import ConfigFileNotFoundError, ConfigFileInvalidError
 
@@ -41,6 +41,7 @@ def main():
     app.setApplicationName("UltraBrowser")
     app.setOrganizationName("Navigator")
     
+    window = None
     try:
         # Crear y mostrar ventana principal
         window = BrowserWindow()
@@ -50,16 +51,21 @@ def main():
         
         # Ejecutar aplicación
         exit_code = app.exec()
-        logger.info(f"Aplicación finalizada con código: {exit_code}")
+        logger.info("Aplicación finalizada con código: %s", exit_code)
         return exit_code
         
     except Exception as e:
-        logger.critical(f"Error crítico al iniciar la aplicación: {e}", exc_info=True)
+        logger.critical("Error crítico al iniciar la aplicación: %s", e, exc_info=True)
         return 1
     finally:
+        # Destruir la ventana (y con ella sus páginas) antes que la QApplication:
+        # al salir de main() Python liberaría antes `app`, y ~QApplication
+        # borraría el perfil compartido con páginas aún vivas
+        window = None
         logger.info("=" * 60)
         logger.info("UltraBrowser finalizado")
         logger.info("=" * 60)
+        shutdown_logging()
 
 if __name__ == "__main__":
     sys.exit(main())
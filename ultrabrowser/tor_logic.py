@@ -2,12 +2,19 @@
 Gestión de conexión Tor: Configuración SOCKS5 y comunicación con el proceso Tor
 """
 
+from contextlib import ExitStack
+from functools import lru_cache
 from typing import Optional
+import http.client
+import json
 from PyQt6.QtNetwork import QNetworkProxy
-from stem.control import Controller
+from stem.control import Controller, Listener
 from stem import Signal
 import stem.process
+import re
 import socket
+import struct
+import threading
 import time
 from pathlib import Path
 import os
@@ -22,8 +29,111 @@ from .exceptions import (
 )
 from .logging_config import get_logger
 from .config import get_config, TorConfig
+from .utils import ensure_dir
 
-logger = get_logger()
+logger = get_logger(__name__)
+
+
+@lru_cache(maxsize=4)
+def _make_proxy(host: str, port: int) -> QNetworkProxy:
+    """
+    Crea el proxy SOCKS5 de Tor una sola vez por (host, puerto)
+    
+    Nota: Las consultas DNS también pasarán por Tor con SOCKS5
+    """
+    proxy = QNetworkProxy(QNetworkProxy.ProxyType.Socks5Proxy)
+    proxy.setHostName(host)
+    proxy.setPort(port)
+    return proxy
+
+
+@lru_cache(maxsize=1)
+def _no_proxy() -> QNetworkProxy:
+    """Proxy "sin proxy" usado al deshabilitar Tor (se crea una sola vez)"""
+    return QNetworkProxy(QNetworkProxy.ProxyType.NoProxy)
+
+
+# Sockets de control UNIX habituales del Tor del sistema (Linux)
+_CONTROL_SOCKET_PATHS = (Path('/run/tor/control'), Path('/var/run/tor/control'))
+
+# Tiempo máximo para comprobar el puerto SOCKS5 (Tor suele ser local)
+_SOCKS_PROBE_TIMEOUT = 0.5
+
+# Segundos durante los que una verificación completa se da por buena
+_VERIFY_CACHE_SECONDS = 1.0
+
+# SO_LINGER activado con espera 0: close() envía RST y no deja TIME_WAIT
+_LINGER_RESET = struct.pack('ii', 1, 0)
+
+# Progreso de arranque en la respuesta de GETINFO status/bootstrap-phase
+_BOOTSTRAP_PROGRESS_RE = re.compile(r'PROGRESS=(\d+)')
+
+# Intervalo entre consultas del progreso de arranque de Tor
+_BOOTSTRAP_POLL_INTERVAL = 0.5
+
+# Servicio para consultar la IP de salida de Tor
+_IP_CHECK_HOST = "check.torproject.org"
+_IP_CHECK_PATH = "/api/ip"
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Lee exactamente size bytes del socket"""
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Conexión cerrada por el proxy SOCKS5")
+        data += chunk
+    return data
+
+
+def _socks5_connect(sock: socket.socket, host: str, port: int) -> None:
+    """
+    Negocia un CONNECT SOCKS5 (RFC 1928) sin autenticación
+    
+    El nombre de host se envía tal cual para que Tor resuelva el DNS.
+    """
+    # Versión 5, un método: sin autenticación
+    sock.sendall(b'\x05\x01\x00')
+    if _recv_exact(sock, 2) != b'\x05\x00':
+        raise ConnectionError("El proxy SOCKS5 rechazó el método de autenticación")
+    
+    host_bytes = host.encode('idna')
+    sock.sendall(b'\x05\x01\x00\x03' + bytes([len(host_bytes)]) + host_bytes + port.to_bytes(2, 'big'))
+    reply = _recv_exact(sock, 4)
+    if reply[0] != 0x05:
+        raise ConnectionError(f"Respuesta SOCKS5 con versión inesperada ({reply[0]})")
+    if reply[1] != 0:
+        raise ConnectionError(f"El proxy SOCKS5 rechazó la conexión (código {reply[1]})")
+    
+    # Descartar la dirección enlazada (IPv4, dominio o IPv6) y el puerto
+    address_type = reply[3]
+    if address_type == 1:
+        address_size = 4
+    elif address_type == 4:
+        address_size = 16
+    elif address_type == 3:
+        address_size = _recv_exact(sock, 1)[0]
+    else:
+        raise ConnectionError(f"Tipo de dirección SOCKS5 desconocido ({address_type})")
+    _recv_exact(sock, address_size + 2)
+
+
+class _Socks5HTTPSConnection(http.client.HTTPSConnection):
+    """Conexión HTTPS keep-alive que atraviesa el proxy SOCKS5 de Tor"""
+    
+    def __init__(self, host: str, proxy_host: str, proxy_port: int, timeout: float):
+        super().__init__(host, timeout=timeout)
+        self._proxy_address = (proxy_host, proxy_port)
+    
+    def connect(self) -> None:
+        sock = socket.create_connection(self._proxy_address, self.timeout)
+        try:
+            _socks5_connect(sock, self.host, self.port)
+            self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+        except Exception:
+            sock.close()
+            raise
 
 
 class TorManager:
@@ -37,7 +147,19 @@ class TorManager:
             tor_config: Configuración de Tor. Si es None, usa la configuración global
             debug_mode: Modo debug. Si es None, usa la configuración global
         """
+        # Controlador autenticado reutilizado entre llamadas (ver _get_controller)
         self.controller: Optional[Controller] = None
+        self._controller_lock = threading.Lock()
+        # Permite abortar desde la UI la espera del arranque (ver cancel_launch)
+        self._launch_cancelled = threading.Event()
+        # Conexión HTTPS reutilizada por get_current_ip
+        self._ip_connection: Optional[_Socks5HTTPSConnection] = None
+        # Momento (time.monotonic) de la última verificación completa correcta
+        self._last_verified: Optional[float] = None
+        # Socket de control UNIX (más barato que TCP), si el sistema lo ofrece
+        self._control_uds: Optional[str] = None
+        if hasattr(socket, 'AF_UNIX'):
+            self._control_uds = next((str(p) for p in _CONTROL_SOCKET_PATHS if p.exists()), None)
         self.tor_enabled = False
         self._tor_process = None
         
@@ -46,14 +168,66 @@ class TorManager:
         self.tor_config = tor_config or config.tor
         self.debug_mode = debug_mode if debug_mode is not None else config.debug_mode
         
-        # Configurar proxy SOCKS5 para Tor
-        self.proxy = QNetworkProxy()
-        self.proxy.setType(QNetworkProxy.ProxyType.Socks5Proxy)
-        self.proxy.setHostName(self.tor_config.host)
-        self.proxy.setPort(self.tor_config.socks_port)
-        # Nota: Las consultas DNS también pasarán por Tor con SOCKS5
+        # Proxy SOCKS5 para Tor (compartido entre instancias con el mismo destino)
+        self.proxy = _make_proxy(self.tor_config.host, self.tor_config.socks_port)
+        
+        logger.debug("TorManager inicializado - Host: %s, Port: %s", self.tor_config.host, self.tor_config.socks_port)
+    
+    def _get_controller(self) -> Controller:
+        """
+        Devuelve el controlador de Tor autenticado, conectándolo solo si no
+        hay uno vivo (evita el handshake TCP + AUTHENTICATE en cada llamada)
+        
+        Returns:
+            Controlador conectado y autenticado
+        """
+        with self._controller_lock:
+            if self.controller is not None and self.controller.is_alive():
+                return self.controller
+            self.controller = self._connect_controller()
+            return self.controller
+    
+    def _connect_controller(self) -> Controller:
+        """
+        Conecta y autentica un controlador, preferiendo el socket UNIX
+        
+        El socket UNIX solo se usa si ese Tor escucha en el puerto SOCKS
+        configurado; si no, se descarta y se usa el puerto de control.
+        """
+        # El ExitStack cierra el controlador ante cualquier fallo; pop_all()
+        # lo conserva abierto solo cuando se va a devolver
+        if self._control_uds is not None:
+            try:
+                with ExitStack() as stack:
+                    controller = stack.enter_context(Controller.from_socket_file(path=self._control_uds))
+                    controller.authenticate()
+                    socks_address = (self.tor_config.host, self.tor_config.socks_port)
+                    if socks_address in controller.get_listeners(Listener.SOCKS):
+                        stack.pop_all()
+                        return controller
+                logger.debug("El socket de control %s pertenece a otra instancia de Tor", self._control_uds)
+            except Exception as e:
+                logger.debug("No se pudo usar el socket de control %s: %s", self._control_uds, e)
+            self._control_uds = None
         
-        logger.debug(f"TorManager inicializado - Host: {self.tor_config.host}, Port: {self.tor_config.socks_port}")
+        with ExitStack() as stack:
+            controller = stack.enter_context(Controller.from_port(port=self.tor_config.control_port))
+            controller.authenticate()
+            stack.pop_all()
+        return controller
+    
+    def _close_controller(self) -> None:
+        """Cierra el controlador persistente si existe"""
+        with self._controller_lock:
+            if self.controller is not None:
+                self.controller.close()
+                self.controller = None
+    
+    def _close_ip_connection(self) -> None:
+        """Cierra la conexión usada por get_current_ip si existe"""
+        if self._ip_connection is not None:
+            self._ip_connection.close()
+            self._ip_connection = None
     
     def is_tor_running(self) -> bool:
         """
@@ -67,13 +241,11 @@ class TorManager:
             TorAuthenticationError: Si hay error de autenticación
         """
         try:
-            controller = Controller.from_port(port=self.tor_config.control_port)
-            controller.authenticate()
-            controller.close()
+            self._get_controller()
             logger.debug("Tor está ejecutándose correctamente")
             return True
         except (ConnectionRefusedError, OSError) as e:
-            logger.warning(f"Tor no está disponible en el puerto {self.tor_config.control_port}: {e}")
+            logger.warning("Tor no está disponible en el puerto %s: %s", self.tor_config.control_port, e)
             if self.debug_mode:
                 raise TorNotRunningError(f"Tor no está ejecutándose: {e}") from e
             return False
@@ -81,11 +253,11 @@ class TorManager:
             # Intentar identificar si es error de autenticación
             error_str = str(e).lower()
             if 'authentication' in error_str or 'password' in error_str:
-                logger.error(f"Error de autenticación con Tor: {e}")
+                logger.error("Error de autenticación con Tor: %s", e)
                 if self.debug_mode:
                     raise TorAuthenticationError(f"Error de autenticación: {e}") from e
             else:
-                logger.error(f"Error inesperado al verificar Tor: {e}")
+                logger.error("Error inesperado al verificar Tor: %s", e)
                 if self.debug_mode:
                     raise TorConnectionError(f"Error inesperado: {e}") from e
             return False
@@ -106,25 +278,78 @@ class TorManager:
         Returns:
             True si Tor está completamente funcional, False en caso contrario
         """
+        # Verificación reciente y controlador aún conectado: no repetirla
+        if (
+            self._last_verified is not None
+            and time.monotonic() - self._last_verified < _VERIFY_CACHE_SECONDS
+            and self.controller is not None
+            and self.controller.is_alive()
+        ):
+            return True
+        self._last_verified = None
+        
         # 1. Verificar puerto de control
         if not self.is_tor_running():
             return False
         
         # 2. Verificar proxy SOCKS5
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((self.tor_config.host, self.tor_config.socks_port))
-            sock.close()
-            if result == 0:
-                logger.debug(f"Proxy SOCKS5 verificado en {self.tor_config.host}:{self.tor_config.socks_port}")
-                return True
-            else:
-                logger.warning(f"Proxy SOCKS5 no disponible en {self.tor_config.host}:{self.tor_config.socks_port}")
-                return False
+            sock = socket.create_connection(
+                (self.tor_config.host, self.tor_config.socks_port), timeout=_SOCKS_PROBE_TIMEOUT
+            )
+        except OSError as e:
+            logger.warning("Proxy SOCKS5 no disponible en %s:%s: %s", self.tor_config.host, self.tor_config.socks_port, e)
+            return False
         except Exception as e:
-            logger.error(f"Error al verificar proxy SOCKS5: {e}")
+            logger.error("Error al verificar proxy SOCKS5: %s", e)
             return False
+        with sock:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RESET)
+            except OSError as e:
+                # Solo evita el TIME_WAIT: el proxy ya respondió
+                logger.debug("No se pudo activar SO_LINGER en la sonda SOCKS5: %s", e)
+        
+        logger.debug("Proxy SOCKS5 verificado en %s:%s", self.tor_config.host, self.tor_config.socks_port)
+        self._last_verified = time.monotonic()
+        return True
+    
+    def prepare_tor(self) -> bool:
+        """
+        Inicia Tor si no está corriendo y verifica la conexión completa.
+        No toca el proxy de Qt, por lo que puede ejecutarse fuera del hilo de la UI
+        
+        No rearma la cancelación: quien encola el trabajo debe llamar antes a
+        reset_launch, de modo que un cancel_launch previo al arranque no se pierda
+        
+        Returns:
+            True si Tor está listo para usarse, False en caso contrario
+        """
+        # Si Tor no está corriendo, intentar iniciarlo
+        if not self.is_tor_running():
+            logger.info("Tor no está corriendo. Intentando iniciar proceso...")
+            if not self.launch_tor():
+                logger.error("No se pudo iniciar el proceso Tor")
+                return False
+        
+        if not self.verify_tor_connection():
+            logger.warning("Tor no está disponible incluso después de intentar iniciarlo.")
+            return False
+        return True
+    
+    def cancel_launch(self) -> None:
+        """Aborta la espera del arranque de Tor en curso (seguro desde cualquier hilo)"""
+        self._launch_cancelled.set()
+    
+    def reset_launch(self) -> None:
+        """Anula un cancel_launch anterior (llamar antes de encolar prepare_tor)"""
+        self._launch_cancelled.clear()
+    
+    def activate_proxy(self) -> None:
+        """Configura el proxy de Tor como proxy global de Qt (desde el hilo de la UI)"""
+        QNetworkProxy.setApplicationProxy(self.proxy)
+        self.tor_enabled = True
+        logger.info("Tor habilitado - Proxy SOCKS5 configurado en %s:%s", self.tor_config.host, self.tor_config.socks_port)
     
     def enable_tor(self) -> bool:
         """
@@ -134,27 +359,16 @@ class TorManager:
             True si Tor se habilitó correctamente, False en caso contrario
         """
         try:
-             # Si Tor no está corriendo, intentar iniciarlo
-             if not self.is_tor_running():
-                 logger.info("Tor no está corriendo. Intentando iniciar proceso...")
-                 if not self.launch_tor():
-                      logger.error("No se pudo iniciar el proceso Tor")
-                      return False
-
-             if not self.verify_tor_connection():
-                 logger.warning("Tor no está disponible incluso después de intentar iniciarlo.")
-                 return False
-
-             # Configurar proxy global (para otras conexiones de Qt)
-             QNetworkProxy.setApplicationProxy(self.proxy)
-             self.tor_enabled = True
-             logger.info(f"Tor habilitado - Proxy SOCKS5 configurado en {self.tor_config.host}:{self.tor_config.socks_port}")
-             return True
+            if not self.prepare_tor():
+                return False
+            # Configurar proxy global (para otras conexiones de Qt)
+            self.activate_proxy()
+            return True
         except Exception as e:
-             logger.error(f"Error al habilitar Tor: {e}")
-             if self.debug_mode:
-                 raise TorProxyError(f"Error al configurar proxy: {e}") from e
-             return False
+            logger.error("Error al habilitar Tor: %s", e)
+            if self.debug_mode:
+                raise TorProxyError(f"Error al configurar proxy: {e}") from e
+            return False
 
     def launch_tor(self) -> bool:
         """
@@ -176,9 +390,9 @@ class TorManager:
                 
                 if path.exists():
                      tor_cmd = str(path.absolute())
-                     logger.info(f"Usando binario Tor configurado: {tor_cmd}")
+                     logger.info("Usando binario Tor configurado: %s", tor_cmd)
                 else:
-                     logger.warning(f"Binario configurado no encontrado en {path}. Intentando autodetectar.")
+                     logger.warning("Binario configurado no encontrado en %s. Intentando autodetectar.", path)
             
             # 2. Auto-detect bundled binary if not configured or not found
             if tor_cmd == 'tor':
@@ -197,11 +411,11 @@ class TorManager:
                     tor_cmd = str(bundled_path.absolute())
                     # Ensure DataDirectory is also platform specific if needed, but we use bin/Tor/data
                     # We might want to move data relative to the binary too
-                    logger.info(f"Usando binario Tor embebido ({system}): {tor_cmd}")
+                    logger.info("Usando binario Tor embebido (%s): %s", system, tor_cmd)
 
             # 3. Configure Data Directory relative to binary or common
             data_dir = Path.cwd() / 'bin/tor_data'
-            data_dir.mkdir(parents=True, exist_ok=True)
+            ensure_dir(data_dir)
             
             tor_config = {
                 'SocksPort': str(self.tor_config.socks_port),
@@ -211,26 +425,76 @@ class TorManager:
             
             launch_kwargs = {
                 'config': tor_config,
-                'init_msg_handler': lambda line: logger.debug(f"Tor init: {line}"),
+                'init_msg_handler': lambda line: logger.debug("Tor init: %s", line),
                 'take_ownership': False,
-                'completion_percent': 100,
+                # stem solo aplica su timeout en el hilo principal: fuera de él
+                # esperaría el 100% sin límite. Se espera solo al arranque del
+                # proceso y el progreso se vigila con _wait_for_bootstrap
+                'completion_percent': 0,
                 'tor_cmd': tor_cmd
             }
 
             self._tor_process = stem.process.launch_tor_with_config(**launch_kwargs)
+            if not self._wait_for_bootstrap():
+                logger.error("Tor no completó el arranque (límite: %ss)", self.tor_config.bootstrap_timeout)
+                self._kill_tor_process()
+                return False
             logger.info("Proceso Tor iniciado correctamente")
             return True
             
         except OSError as e:
-             logger.error(f"Error al iniciar Tor: {e}")
+             logger.error("Error al iniciar Tor: %s", e)
              logger.error("Asegúrate de que Tor esté instalado y en el PATH o configurado en config.json")
              return False
         except Exception as e:
-             logger.error(f"Error inesperado al iniciar Tor: {e}")
+             logger.error("Error inesperado al iniciar Tor: %s", e)
              return False
              
+    def _wait_for_bootstrap(self) -> bool:
+        """
+        Espera a que Tor complete el arranque (100%) consultando el controlador
+        
+        Returns:
+            True si terminó antes de tor_config.bootstrap_timeout, False si
+            se agotó el plazo o se llamó a cancel_launch
+        """
+        deadline = time.monotonic() + self.tor_config.bootstrap_timeout
+        while True:
+            try:
+                phase = self._get_controller().get_info('status/bootstrap-phase')
+                match = _BOOTSTRAP_PROGRESS_RE.search(phase)
+                if match:
+                    progress = int(match.group(1))
+                    logger.debug("Arranque de Tor: %s%%", progress)
+                    if progress >= 100:
+                        return True
+            except Exception as e:
+                # El puerto de control puede no estar listo todavía
+                logger.debug("Progreso de arranque no disponible: %s", e)
+            if time.monotonic() >= deadline:
+                return False
+            if self._launch_cancelled.wait(_BOOTSTRAP_POLL_INTERVAL):
+                logger.info("Arranque de Tor cancelado")
+                return False
+    
+    def _kill_tor_process(self) -> None:
+        """Detiene el proceso Tor lanzado por este gestor, si existe"""
+        self._close_controller()
+        if self._tor_process is not None:
+            try:
+                self._tor_process.kill()
+                self._tor_process.wait()
+            except Exception as e:
+                logger.warning("Error al detener el proceso Tor: %s", e)
+            self._tor_process = None
+    
     def __del__(self):
         """Limpieza al destruir el objeto"""
+        if self.controller is not None:
+            try:
+                self.controller.close()
+            except:
+                pass
         if self._tor_process:
             try:
                 self._tor_process.kill()
@@ -246,12 +510,14 @@ class TorManager:
         """
         try:
             # Restaurar proxy por defecto (sin proxy)
-            QNetworkProxy.setApplicationProxy(QNetworkProxy(QNetworkProxy.ProxyType.NoProxy))
+            QNetworkProxy.setApplicationProxy(_no_proxy())
             self.tor_enabled = False
+            self._close_controller()
+            self._close_ip_connection()
             logger.info("Tor deshabilitado")
             return True
         except Exception as e:
-            logger.error(f"Error al deshabilitar Tor: {e}")
+            logger.error("Error al deshabilitar Tor: %s", e)
             if self.debug_mode:
                 raise TorProxyError(f"Error al deshabilitar proxy: {e}") from e
             return False
@@ -268,14 +534,11 @@ class TorManager:
             return False
         
         try:
-            controller = Controller.from_port(port=self.tor_config.control_port)
-            controller.authenticate()
-            controller.signal(Signal.NEWNYM)
-            controller.close()
+            self._get_controller().signal(Signal.NEWNYM)
             logger.info("Nueva identidad de Tor solicitada")
             return True
         except Exception as e:
-            logger.error(f"Error al solicitar nueva identidad: {e}")
+            logger.error("Error al solicitar nueva identidad: %s", e)
             if self.debug_mode:
                 raise TorConnectionError(f"Error al solicitar nueva identidad: {e}") from e
             return False
@@ -292,27 +555,28 @@ class TorManager:
             return None
         
         try:
-            # Crear socket a través del proxy Tor
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(self.tor_config.timeout)
-            sock.connect((self.tor_config.host, self.tor_config.socks_port))
-            
-            # Enviar solicitud HTTP a través del proxy
-            request = b"GET http://check.torproject.org/api/ip HTTP/1.1\r\nHost: check.torproject.org\r\n\r\n"
-            sock.sendall(request)
-            
-            response = sock.recv(4096).decode()
-            sock.close()
+            # La conexión se mantiene abierta entre llamadas (keep-alive)
+            if self._ip_connection is None:
+                self._ip_connection = _Socks5HTTPSConnection(
+                    _IP_CHECK_HOST, self.tor_config.host, self.tor_config.socks_port, self.tor_config.timeout
+                )
+            try:
+                self._ip_connection.request("GET", _IP_CHECK_PATH)
+                response = self._ip_connection.getresponse()
+                body = response.read()
+            except Exception:
+                self._close_ip_connection()
+                raise
             
-            # Extraer IP de la respuesta (simplificado)
-            if "IP" in response:
+            ip = json.loads(body).get("IP") if response.status == 200 else None
+            if ip:
                 logger.debug("IP obtenida a través de Tor")
-                return response
-            logger.warning("No se pudo extraer IP de la respuesta")
+                return ip
+            logger.warning("No se pudo extraer IP de la respuesta (HTTP %s)", response.status)
             return None
         except socket.timeout:
-            logger.error(f"Timeout al obtener IP (timeout: {self.tor_config.timeout}s)")
+            logger.error("Timeout al obtener IP (timeout: %ss)", self.tor_config.timeout)
             return None
         except Exception as e:
-            logger.error(f"Error al obtener IP: {e}")
+            logger.error("Error al obtener IP: %s", e)
             return None
@@ -0,0 +1,24 @@
+"""
+Utilidades compartidas por los módulos de UltraBrowser
+"""
+
+from pathlib import Path
+from typing import Set
+
+# Directorios ya creados/verificados durante esta ejecución
+_ensured_dirs: Set[Path] = set()
+
+
+def ensure_dir(directory: Path) -> None:
+    """
+    Crea un directorio (y sus padres) si no existe
+    
+    Solo toca el sistema de archivos la primera vez que se pide cada
+    directorio; las llamadas posteriores no hacen ninguna syscall.
+    
+    Args:
+        directory: Directorio a crear
+    """
+    if directory not in _ensured_dirs:
+        directory.mkdir(parents=True, exist_ok=True)
+        _ensured_dirs.add(directory)